@@ -11,19 +11,33 @@ Style is PEP8 compliant except: continuation lines are indented
 
 The following functions include assumptions specific to bikeshare data:
 get_filters - Prompt user to enter filtering requirements.
+available_cities - Return the CITY_DATA entries with data files found.
 load_data - Load bikeshare data from csv files based on filtering.
+filter_data - Filter loaded bikeshare data by month and day of week.
+time_stats_data - Calculate most frequent trip start times.
 time_stats - Summary statistics of most frequent trip start times.
+station_stats_data - Calculate most frequent stations and paths.
 station_stats - Summary statistics of start and end stations and paths.
+trip_duration_stats_data - Calculate trip durations in seconds.
 trip_duration_stats - Summary statistics of trip durations.
+user_stats_data - Calculate user characteristics.
 user_stats - Summary statistics of user characteristics.
 main_loop - Main control loop to interact with user and display data.
+statistics_report - Collect the results of all statistics calculations.
+query_report - Filter city data and collect its statistics report.
+handle_request - Answer one HTTP statistics query as JSON.
+serve - Keep all city data in memory and answer HTTP queries.
 main - Process command line switches and handle exceptions in main_loop.
 
 The following functions will also work generically:
 clean_input - Handling of user input including KeyboardInterrupt.
-list_csv_files - Return filenames of csv files in working directory.
+list_csv_files - Return filenames of csv files matching a pattern.
+city_partitions - Return the csv partition files of a CITY_DATA entry.
+partition_month - Return the month encoded in a partition filename.
 match_start_string - Return options in list that match substring.
 unique_selection - Interact with user to identify unique option in list.
+most_common - Return the most frequent item(s) in column.
+counts_shares - Return category column counts and shares.
 display_categories - Category and result columns adjusted to data.
 display_counts_shares - Display category column counts and shares.
 display_most_common - Display the most frequent item(s) in column.
@@ -34,22 +48,41 @@ main() and the clean_input() function. In addition to a general
 exception catchall (non-silent), KeyboardInterrupt is intercepted to
 cleanly exit the program. A command line switch is provided
 (-d, --debug) that allows this exception handling to be switched off
-during development or investigation of problems.
+during development or investigation of problems. In server mode
+(-s, --serve), bad queries and failures while answering them are
+reported to the client with an HTTP error status instead.
 
 Invoke with '-h_ or --help' to display all optional arguments.
 """
 import time
-import numpy as np
 import pandas as pd
 # argparse - Needed for function "main"
 import argparse
 # glob - Needed for function "list_csv_files"
 import glob
+# os, re - Needed for functions "city_partitions" and "partition_month"
+import os
+import re
+# concurrent.futures - Needed for function "load_data"
+from concurrent.futures import ThreadPoolExecutor
+# asyncio, functools, http, json, urllib and collections - Needed for
+# the server mode functions
+import asyncio
+import functools
+import http
+import json
+import urllib.parse
+from collections import OrderedDict
 # ---------------------------------------------------------------------
 # USER CONSTANTS - This section contains structures extendable in usage
 
 # This is the list of supported files. Only files that are in this list
 # AND in the working directory will be offered to user for selection.
+# An entry may also be a glob pattern (e.g. 'chicago_*.csv') or a
+# directory, in which case all matching csv files are read as
+# partitions of one dataset. Partitions named with a year and month
+# (e.g. 'chicago_2017-03.csv' or 'chicago_2017-03-15.csv') are skipped
+# when they cannot match the month filter.
 # Assumes that filenames are not duplicated with different case.
 # Assumes no missing data in any columns except gender & birth year.
 # USER: add files as they become available, including test files.
@@ -76,6 +109,24 @@ WEEKDAYS = ('Sunday', 'Monday', 'Tuesday', 'Wednesday',
         'Thursday', 'Friday', 'Saturday',
         )
 
+# Maximum number of partition files read at the same time by load_data.
+LOAD_WORKERS = 4
+
+# Year and month in a partition filename, e.g. 'chicago_2017-03.csv'.
+# Only months 01 to 12 are recognized.
+PARTITION_MONTH_PATTERN = re.compile(
+        r'\d{4}-(0[1-9]|1[0-2])(?:-\d{2})?\.csv$')
+
+# Server mode: the address is loopback only, so not reachable remotely.
+SERVER_HOST = '127.0.0.1'
+# Number of query results kept by the server, least recently used first
+# to be evicted.
+QUERY_CACHE_SIZE = 64
+# Seconds a client may take to send its request before it is dropped.
+REQUEST_TIMEOUT = 5
+# Most header lines accepted in a request (all are skipped).
+MAX_HEADER_LINES = 100
+
 # Strings that are used in multiple places are defined once here.
 QUIT_RECOGNIZED = 'You requested to quit. The program has ended.'
 SIGNOFF = '\nThanks for using this bikeshare data explorer! \n'
@@ -99,16 +150,53 @@ def clean_input(prompt):
         return 'Quit'
 
 
-def list_csv_files():
-    """Get a list of csv files from the working directory.
+def list_csv_files(pattern='*.csv'):
+    """Get a sorted list of csv files matching a glob pattern.
 
     This function requires glob to be imported.
-    It returns a list of the names of the files, WITHOUT the ".csv".
+    By default all csv files in the working directory are listed. A
+    plain filename is returned only if that file exists.
+    Args:
+        (str) pattern - Glob pattern of the files (default "*.csv").
     Returns:
-        (list) list of filenames of csv files in working directory.
+        (list) list of filenames of csv files matching the pattern.
     """
     # See README.txt Ref#2.
-    return [filename for filename in glob.glob("*.csv")]
+    return sorted(glob.glob(pattern))
+
+
+def city_partitions(city_file):
+    """Get the list of csv files making up one entry of CITY_DATA.
+
+    The entry may be a single filename, a glob pattern or a directory.
+    For a directory, all csv files directly within it are returned.
+    Args:
+        (str) city_file - Filename, glob pattern or directory.
+    Returns:
+        (list) Sorted list of partition filenames, empty if none found.
+    """
+    if os.path.isdir(city_file):
+        return list_csv_files(os.path.join(city_file, '*.csv'))
+    return list_csv_files(city_file)
+
+
+def partition_month(filename):
+    """Get the month number encoded in a partition filename.
+
+    Monthly ('name_2017-03.csv') and daily ('name_2017-03-15.csv')
+    partitions are recognized, for months 01 to 12. Any other filename
+    (including e.g. 'name_2017-13.csv') may contain data for any month,
+    so there is a special value for the return value:
+        None - The month is not known from the filename.
+    Args:
+        (str) filename - Name of the partition file.
+    Returns:
+        (int) Month number (January is 1), or None.
+    """
+    match = PARTITION_MONTH_PATTERN.search(os.path.basename(filename))
+    if match is None:
+        return None
+    return int(match.group(1))
 
 
 def match_start_string(list_to_search, substring):
@@ -164,13 +252,49 @@ def unique_selection(prompt_text, option_list):
     return str(matched).strip("'[]")
 
 
-def display_categories(results_dict, category_header, result_header):
+def most_common(df, column_name):
+    """Get the most common elements in a dataframe column.
+
+    Elements may be categories or values (types supporting .mode()).
+    In the case of multiple elements having the same count, all of
+    these are returned.
+    Args:
+        (DataFrame) df - Pandas dataframe.
+        (str) column_name - Pandas dataframe column name.
+    Returns:
+        (list) The most common element(s), as python values.
+    """
+    return df[column_name].mode().tolist()
+
+
+def counts_shares(df, column_name):
+    """Get counts and shares of a dataframe column of categories.
+
+    Missing values are not counted.
+    Args:
+        (DataFrame) df - Pandas dataframe.
+        (str) column_name - Pandas dataframe column with categories.
+    Returns:
+        (dict) category_counts - Number of rows of each category.
+        (dict) category_shares - Percentage of rows of each category.
+    """
+    category_counts = {str(k): int(v)
+            for k,v in df[column_name].value_counts().items()}
+    total_categories = sum(category_counts.values())
+    category_shares = {k: 100 * v / total_categories
+            for k,v in category_counts.items()}
+    return category_counts, category_shares
+
+
+def display_categories(results_dict, category_header, result_header,
+        file=None):
     """Display category values in columns, adjusting to content.
 
     Args:
         (dict) results_dict - Dictionary of categories and values.
         (str) category_header - Header of category column.
         (str) result_header - Header of result column.
+        (file) file - Stream to display on (default None is stdout).
     Returns:
         None.
     """
@@ -185,73 +309,74 @@ def display_categories(results_dict, category_header, result_header):
 
     # Display header and row of dashes aligned to columns.
     print('{}'.format(category_header).ljust(max_category_width)
-            + ' ' * pad + '{}'.format(result_header).rjust(max_result_width))
-    print('-' * max_category_width + '-' * pad + '-' * max_result_width)
+            + ' ' * pad + '{}'.format(result_header).rjust(max_result_width),
+            file=file)
+    print('-' * max_category_width + '-' * pad + '-' * max_result_width,
+            file=file)
 
     # Display content in columns.
     for category,result in results_dict.items():
         print('{}'.format(category).ljust(max_category_width)
-                + ' ' * pad + '{}'.format(result).rjust(max_result_width) )
-    print('')   # Blank line after final output improves format.
+                + ' ' * pad + '{}'.format(result).rjust(max_result_width),
+                file=file)
+    print('', file=file)   # Blank line after final output improves format.
 
 
-def display_counts_shares(df, title, column_name, precision):
-    """Display counts and shares of a dataframe column of categories.
+def display_counts_shares(category_counts, category_shares, title,
+        precision, file=None):
+    """Display counts and shares of categories, as from counts_shares.
 
     Args:
-        (DataFrame) df - Pandas dataframe.
+        (dict) category_counts - Number of rows of each category.
+        (dict) category_shares - Percentage of rows of each category.
         (str) title - Name to display as header of categories column.
-        (str) column_name - Pandas dataframe column with categories.
         (int) precision - Number of decimal places for the share values.
+        (file) file - Stream to display on (default None is stdout).
     Returns:
         None.
     """
-    category_counts = dict(df[column_name].value_counts())
-    total_categories = df[column_name].count()
+    # Display shares of categories.  Floating precision set by argument.
+    share_strings = {k: '{0:.{1}f}%'.format(v, precision)
+            for k,v in category_shares.items()}
 
-    # Display shares of user types.  Floating precision set by argument.
-    category_shares = {k: '{0:.{1}f}%'.format(100 * v
-            / total_categories, precision) for k,v in category_counts.items()}
+    display_categories(category_counts,title,'Count', file=file)
+    display_categories(share_strings,title,'Share(%)', file=file)
 
-    display_categories(category_counts,title,'Count')
-    display_categories(category_shares,title,'Share(%)')
 
+def display_most_common(description, common_items, show_in_rows=False,
+        file=None):
+    """Display the most common elements, as from most_common.
 
-def display_most_common(description, df, column_name,
-        show_in_rows=False):
-    """Display the most common elements in a dataframe.
-
-    Elements may be categories or values (types supporting .mode()).
     In the case of multiple categories having the same count, a list of
-    these is displayed. If the optional 'list' argument is set to True,
-    the output is displayed with one item per row. Otherwise the list
-    is displayed as a series of comma-separated categories. The argument
-    name list is not to be confused with the type list.
+    these is displayed. If the optional 'show_in_rows' argument is set
+    to True, the output is displayed with one item per row. Otherwise
+    the list is displayed as a series of comma-separated categories.
     Args:
         (str) description - Descriptive text preceding list of items.
-        (DataFrame) df - Pandas dataframe.
-        (str) column_name - Pandas dataframe column name.
+        (list) common_items - The most common element(s).
         (bool) show_in_rows - Show results in rows or in line (default).
+        (file) file - Stream to display on (default None is stdout).
     Returns:
         None.
     """
-    most_common = df[column_name].mode().tolist()
-
     if show_in_rows:    # Display in rows (useful for large columns).
-        print(description)
-        list_output = '\t' + '\n\t'.join(str(s) for s in most_common)
-        print(list_output)
-        print('\n',end='')     # Inserts newline after last line in list.
+        print(description, file=file)
+        list_output = '\t' + '\n\t'.join(str(s) for s in common_items)
+        print(list_output, file=file)
+        # Inserts newline after last line in list.
+        print('\n', end='', file=file)
     else:               # Display in a comma-separated line (the default).
-        print(description + ', '.join(str(s) for s in most_common))
+        print(description + ', '.join(str(s) for s in common_items),
+                file=file)
 
 
-def display_duration(description, total_seconds):
+def display_duration(description, total_seconds, file=None):
     """Display durations in seconds in a readable form.
 
     Args:
         (str) description - Descriptive text preceding the values.
         (float) total_seconds - Value in seconds to be displayed.
+        (file) file - Stream to display on (default None is stdout).
     Returns:
         None.
     """
@@ -284,7 +409,7 @@ def display_duration(description, total_seconds):
 
     # Note that only arguments included in the string are printed out.
     print(description + ' ' + print_string.format(days, hours, minutes, seconds,
-            top_calc, top_name, prec=2))
+            top_calc, top_name, prec=2), file=file)
 
 
 def get_filters(available_cities, all_flag):
@@ -343,12 +468,25 @@ def get_filters(available_cities, all_flag):
     return city, month, day
 
 
+def available_cities():
+    """Get the names of the cities in CITY_DATA with data files found.
+
+    Entries may be single files, glob patterns or directories.
+    Returns:
+        (list) List of city names, in the order of CITY_DATA.
+    """
+    return [city_name for city_name, city_file in CITY_DATA.items()
+            if len(city_partitions(city_file)) != 0]
+
+
 def load_data(city, month, day):
     """Load data for specified city, month and day, or as applicable.
 
     There is a special value for the argument values:
         "All" - No filtering is made. This is not an option for city.
-
+    The city may be stored as several partition files (see CITY_DATA).
+    These are read in parallel, skipping any partition whose filename
+    shows it cannot contain the requested month.
     Args:
         (str) city - Name of the city to load.
         (str) month - Name of the month to filter by, or "All".
@@ -359,18 +497,47 @@ def load_data(city, month, day):
     # Load data file into a dataframe.
     print('\nLoading data for city = {}, month = {}, day = {}...'
           .format(city, month, day))
-    df = pd.read_csv(CITY_DATA[city])
+    partitions = city_partitions(CITY_DATA[city])
+
+    # Skip partitions known from their filename to hold another month.
+    if month != 'All':
+        month_number = MONTHS.index(month)
+        partitions = [partition for partition in partitions
+                if partition_month(partition) in (None, month_number)]
+    if len(partitions) == 0:    # Nothing left, no data with this filter.
+        return pd.DataFrame()
+
+    # Read the remaining partitions in parallel and join them together.
+    with ThreadPoolExecutor(
+            max_workers=min(LOAD_WORKERS, len(partitions))) as executor:
+        df = pd.concat(executor.map(pd.read_csv, partitions),
+                ignore_index=True)
 
     # Convert the Start Time column to datetime.
     df['Start Time'] = pd.to_datetime(df['Start Time'])
     # Extract month, day of week, hour from Start Time to create new columns.
     df['Month'] = [MONTHS[int(m)] for m in df['Start Time'].dt.month]
-    df['Day of Week'] = df['Start Time'].dt.weekday_name
+    df['Day of Week'] = df['Start Time'].dt.day_name()
     df['Hour'] = df['Start Time'].dt.hour
     # Create a column for the start and end station pairs.
     df['Path'] = df['Start Station'] + ' => ' + df['End Station']
 
-     # Filter by month, if applicable.
+    return filter_data(df, month, day)
+
+
+def filter_data(df, month, day):
+    """Filter data loaded by load_data by month and day of week.
+
+    There is a special value for the argument values:
+        "All" - No filtering is made.
+    Args:
+        (DataFrame) df - Pandas DataFrame of city data from load_data.
+        (str) month - Name of the month to filter by, or "All".
+        (str) day - Name of the day of week to filter by, or "All".
+    Returns:
+        (DataFrame) - Pandas DataFrame filtered by month & day.
+    """
+    # Filter by month, if applicable.
     if month != 'All':
         df = df[df['Month'] == month]
     # Filter by day of week, if applicable
@@ -379,7 +546,29 @@ def load_data(city, month, day):
     return df
 
 
-def time_stats(df, timing_off_flag, month, day):
+def time_stats_data(df, month, day):
+    """Calculate the most frequent times of travel.
+
+    The function assumes the presence in the Dataframe of columns for
+    'Month', Day of Week' and 'Hour'. The most common month or day is
+    only calculated if there was no filtering of it ("All").
+    Args:
+        (DataFrame) df - Pandas DataFrame of city data after filtering.
+        (str) month - Name of the month that was filtered, or "All".
+        (str) day - Name of the day of week that was filtered, or "All".
+    Returns:
+        (dict) Lists of the most common 'month', 'day' and 'hour'.
+    """
+    time_data = {}
+    if month == "All":
+        time_data['month'] = most_common(df, 'Month')
+    if day == "All":
+        time_data['day'] = most_common(df, 'Day of Week')
+    time_data['hour'] = most_common(df, 'Hour')
+    return time_data
+
+
+def time_stats(df, timing_off_flag, month, day, file=None):
     """Display statistics on the most frequent times of travel.
 
     The function assumes the presence in the Dataframe of columns for
@@ -395,32 +584,56 @@ def time_stats(df, timing_off_flag, month, day):
         (bool) timing_off_flag - If true, timing of function is skipped.
         (str) month - Name of the month that was filtered, or "All".
         (str) day - Name of the day of week that was filtered, or "All".
+        (file) file - Stream to display on (default None is stdout).
     Returns:
         None.
     """
-    print('\nCalculating The Most Frequent Times of Travel...\n')
+    print('\nCalculating The Most Frequent Times of Travel...\n', file=file)
     if not timing_off_flag:
         start_time = time.time()
 
+    time_data = time_stats_data(df, month, day)
+
     # If more than one month, display the most common month.
-    if month == "All":
-        display_most_common('The most common month(s):', df, 'Month')
+    if 'month' in time_data:
+        display_most_common('The most common month(s):',
+                time_data['month'], file=file)
 
     # If more than one day, display the most common day of week.
-    if day == "All":
-        display_most_common('The most common day(s):  ', df, 'Day of Week')
+    if 'day' in time_data:
+        display_most_common('The most common day(s):  ',
+                time_data['day'], file=file)
 
     # Display the most common start hour.
-    display_most_common('The most common hour(s): ', df, 'Hour')
-    print(' (hour(s) in 24h format)')
+    display_most_common('The most common hour(s): ', time_data['hour'],
+            file=file)
+    print(' (hour(s) in 24h format)', file=file)
 
-    print('')        # Blank line after final output improves format.
+    print('', file=file)   # Blank line after final output improves format.
     if not timing_off_flag:
-        print('This took {0:6f} seconds.'.format(time.time() - start_time))
-    print('-' * 40)
+        print('This took {0:6f} seconds.'.format(time.time() - start_time),
+                file=file)
+    print('-' * 40, file=file)
+
 
+def station_stats_data(df):
+    """Calculate the most popular stations and trip.
 
-def station_stats(df, timing_off_flag):
+    The function assumes the presence in the Dataframe of columns for
+    'Start Station', 'End Station' and 'Path'.
+    Args:
+        (DataFrame) df - Pandas DataFrame of city data after filtering.
+    Returns:
+        (dict) Lists of the most common 'start_station', 'end_station'
+        and 'path' (start => end combination).
+    """
+    return {'start_station': most_common(df, 'Start Station'),
+            'end_station': most_common(df, 'End Station'),
+            'path': most_common(df, 'Path'),
+            }
+
+
+def station_stats(df, timing_off_flag, file=None):
     """Display statistics on the most popular stations and trip.
 
     The function assumes the presence in the Dataframe of columns for
@@ -428,34 +641,58 @@ def station_stats(df, timing_off_flag):
     Args:
         (DataFrame) df - Pandas DataFrame of city data after filtering.
         (bool) timing_off_flag - If true, timing of function is skipped.
+        (file) file - Stream to display on (default None is stdout).
     Returns:
         None.
     """
-    print('\nCalculating The Most Popular Stations and Trip...\n')
+    print('\nCalculating The Most Popular Stations and Trip...\n', file=file)
     if not timing_off_flag:
         start_time = time.time()
 
+    station_data = station_stats_data(df)
     show_in_rows = True  # Show results in rows (better for multiples).
 
     # Display most commonly used start station.
-    display_most_common('The most common start stations(s):', df,
-            'Start Station', show_in_rows)
+    display_most_common('The most common start stations(s):',
+            station_data['start_station'], show_in_rows, file=file)
 
     # Display most commonly used end station.
-    display_most_common('The most common end stations(s):', df,
-            'End Station', show_in_rows)
+    display_most_common('The most common end stations(s):',
+            station_data['end_station'], show_in_rows, file=file)
 
     # Display most frequent combination of start and end stations.
-    display_most_common('The most common start => end combination(s):', df,
-            'Path', show_in_rows)
+    display_most_common('The most common start => end combination(s):',
+            station_data['path'], show_in_rows, file=file)
 
-    print('')         # Blank line after final output improves format.
+    print('', file=file)   # Blank line after final output improves format.
     if not timing_off_flag:
-        print('This took {0:6f} seconds.'.format(time.time() - start_time))
-    print('-' * 40)
+        print('This took {0:6f} seconds.'.format(time.time() - start_time),
+                file=file)
+    print('-' * 40, file=file)
+
+
+def trip_duration_stats_data(df):
+    """Calculate statistics of trip durations.
+
+    The function assumes the presence in the Dataframe of a column for
+    'Trip Duration'.
+    Args:
+        (DataFrame) df - Pandas DataFrame of city data after filtering.
+    Returns:
+        (dict) Durations in seconds: 'total', 'shortest', 'mean',
+        'median', 'percentile_90' and 'longest'.
+    """
+    durations = df['Trip Duration']
+    return {'total': float(durations.sum()),
+            'shortest': float(durations.min()),
+            'mean': float(durations.mean()),
+            'median': float(durations.median()),
+            'percentile_90': float(durations.quantile(0.9)),
+            'longest': float(durations.max()),
+            }
 
 
-def trip_duration_stats(df, timing_off_flag):
+def trip_duration_stats(df, timing_off_flag, file=None):
     """Display statistics on the most popular stations and trip.
 
     The function assumes the presence in the Dataframe of a column for
@@ -463,89 +700,136 @@ def trip_duration_stats(df, timing_off_flag):
     Args:
         (DataFrame) df - Pandas DataFrame of city data after filtering.
         (bool) timing_off_flag - If true, timing of function is skipped.
+        (file) file - Stream to display on (default None is stdout).
     Returns:
         None.
     """
-    print('\nCalculating Trip Duration...\n')
+    print('\nCalculating Trip Duration...\n', file=file)
     if not timing_off_flag:
         start_time = time.time()
 
+    duration_data = trip_duration_stats_data(df)
+
     # Display total travel time.
     display_duration('Total duration of all trips:\n',
-            df['Trip Duration'].sum())
+            duration_data['total'], file=file)
 
     # EXTENSION: display minimum travel time.
-    display_duration('Shortest trip duration:\n', df['Trip Duration'].min())
+    display_duration('Shortest trip duration:\n', duration_data['shortest'],
+            file=file)
 
     # Display mean travel time.
-    display_duration('Mean trip duration:\n', df['Trip Duration'].mean())
+    display_duration('Mean trip duration:\n', duration_data['mean'],
+            file=file)
 
     # EXTENSION: display median travel time.
     display_duration('Half of the trips took less than:\n',
-            df['Trip Duration'].median())
+            duration_data['median'], file=file)
 
     # EXTENSION: display 90th percentile travel time.
     display_duration('90% of the trips took less than:\n',
-            df['Trip Duration'].quantile(0.9))
+            duration_data['percentile_90'], file=file)
 
     # EXTENSION: display maximum travel time.
-    display_duration('Longest trip duration:\n', df['Trip Duration'].max())
+    display_duration('Longest trip duration:\n', duration_data['longest'],
+            file=file)
 
-    print('')         # Blank line after final output improves format.
+    print('', file=file)   # Blank line after final output improves format.
     if not timing_off_flag:
-        print('This took {0:6f} seconds.'.format(time.time() - start_time))
-    print('-' * 40)
+        print('This took {0:6f} seconds.'.format(time.time() - start_time),
+                file=file)
+    print('-' * 40, file=file)
+
 
+def user_stats_data(df):
+    """Calculate statistics on bikeshare users.
 
-def user_stats(df, timing_off_flag):
+    The function assumes the presence in the Dataframe of a column for
+    'User Type'. Further columns for 'Gender' and 'Birth Year' are used
+    if available (some data files do not contain these columns).
+    There is a special value for the 'gender' and 'birth_year' entries:
+        None - No data, either no column or no values after filtering.
+    Args:
+        (DataFrame) df - Pandas DataFrame of city data after filtering.
+    Returns:
+        (dict) 'user_type' and 'gender', each a dict of 'counts' and
+        'shares' (%), and 'birth_year', a dict of 'earliest', 'latest'
+        and 'most_common' (list).
+    """
+    user_data = {'user_type': dict(zip(('counts', 'shares'),
+            counts_shares(df, 'User Type')))}
+
+    # The gender column is not always available, or may be all missing.
+    user_data['gender'] = None
+    if 'Gender' in df.columns and df['Gender'].count() != 0:
+        user_data['gender'] = dict(zip(('counts', 'shares'),
+                counts_shares(df, 'Gender')))
+
+    # The birth year column is not always available, or may be all
+    # missing. Missing values are removed before converting to int.
+    # See README.txt Ref#1.
+    user_data['birth_year'] = None
+    if 'Birth Year' in df.columns and df['Birth Year'].count() != 0:
+        bydf = df[['Birth Year']].dropna().astype(int)
+        user_data['birth_year'] = {
+                'earliest': int(bydf['Birth Year'].min()),
+                'latest': int(bydf['Birth Year'].max()),
+                'most_common': most_common(bydf, 'Birth Year'),
+                }
+    return user_data
+
+
+def user_stats(df, timing_off_flag, file=None):
     """Display statistics on bikeshare users.
 
     The function assumes the presence in the Dataframe of a column for
-    'Subscriber Type'. Further columns for 'Gender' and 'Birth Year'
+    'User Type'. Further columns for 'Gender' and 'Birth Year'
     are displayed if available (some data files do not contain
-    these columns).
+    these columns, and filtering may leave them without values).
     Args:
         (DataFrame) df - Pandas DataFrame of city data after filtering.
         (bool) timing_off_flag - If true, timing of function is skipped.
+        (file) file - Stream to display on (default None is stdout).
     Returns:
         None.
     """
-    print('\nCalculating User Stats...\n')
+    print('\nCalculating User Stats...\n', file=file)
     if not timing_off_flag:
         start_time = time.time()
 
+    user_data = user_stats_data(df)
+
     # Display counts and shares of user types.
-    display_counts_shares(df, 'Subscriber Type',
-            'User Type', precision=4)
-
-    # Display counts of gender.
-    # The gender column is not always available, so test first.
-    if 'Gender' in df.columns:
-        # Display counts and shares of gender categories.
-        display_counts_shares(df, 'Gender', 'Gender', precision=2)
+    display_counts_shares(user_data['user_type']['counts'],
+            user_data['user_type']['shares'], 'Subscriber Type',
+            precision=4, file=file)
+
+    # Display counts and shares of gender categories, if available.
+    if user_data['gender'] is not None:
+        display_counts_shares(user_data['gender']['counts'],
+                user_data['gender']['shares'], 'Gender', precision=2,
+                file=file)
     else:
-        print('No data about gender for this city.')
+        print('No data about gender for this city.', file=file)
 
     # Display earliest, most recent, and most common year of birth.
-    # The birth year column is not always available, so test first.
-    if 'Birth Year' in df.columns:
-        # Reduce df['Birth Year'] by removing NaNs, converting to int
-        # and storing in a new dataframe.  Note that the conversion to
-        # DataFrame is needed for compatibility with the
-        # "display_most_common" function.
-        bydf = pd.DataFrame([int(b_year) for b_year in df['Birth Year']
-                if not np.isnan(b_year).any()])  # See README.txt Ref#1.
-
-        print("Earliest year of birth:  {}".format(bydf[0].min()))
-        print("Latest year of birth:    {}".format(bydf[0].max()))
-        display_most_common('The most common year(s): ', bydf, 0)
+    birth_year = user_data['birth_year']
+    if birth_year is not None:
+        print("Earliest year of birth:  {}".format(birth_year['earliest']),
+                file=file)
+        print("Latest year of birth:    {}".format(birth_year['latest']),
+                file=file)
+        display_most_common('The most common year(s): ',
+                birth_year['most_common'], file=file)
     else:
-        print('No data about birth year for this city.')
+        print('No data about birth year for this city.', file=file)
 
-    print('')         # Blank line after final output improves format.
+    print('', file=file)   # Blank line after final output improves format.
     if not timing_off_flag:
-        print('This took {0:6f} seconds.'.format(time.time() - start_time))
-    print('=' * 60)    # the "=" is used to show start and end of blocks
+        print('This took {0:6f} seconds.'.format(time.time() - start_time),
+                file=file)
+    # the "=" is used to show start and end of blocks
+    print('=' * 60, file=file)
 
 
 def main_loop(args):
@@ -582,20 +866,16 @@ def main_loop(args):
     else:
         print('To always use all data (no month or day filters) use option -a')
 
-    # Check which input files are available.
-    file_list = list_csv_files()
-
-    # Dictionary comprehension to create dictionary of found data files.
-    file_dict = {city_name: city_file for city_name, city_file
-            in CITY_DATA.items() if city_file in file_list}
+    # Check which cities have data files available.
+    cities = available_cities()
 
-    if len(file_dict) != 0:     # There are supported files available.
+    if len(cities) != 0:     # There are supported files available.
         # Needed to avoid reloading the same city if no filtering made.
         previous_city = 'No previous city',
         while True:
             # Obtain the desired filter settings.
             # Only offer cities with data files.
-            city, month, day = get_filters(list(file_dict.keys()),args.all)
+            city, month, day = get_filters(cities, args.all)
 
             if 'Quit' in (city, month, day):
                 print('You requested to quit. The program has ended.')
@@ -650,6 +930,186 @@ def main_loop(args):
 
     print(SIGNOFF)
 
+
+def statistics_report(df, month, day):
+    """Run all statistics calculations and collect their results.
+
+    The results are the data displayed by the statistics functions,
+    made of python values ready to be serialized as JSON.
+    Args:
+        (DataFrame) df - Pandas DataFrame of city data after filtering.
+        (str) month - Name of the month that was filtered, or "All".
+        (str) day - Name of the day of week that was filtered, or "All".
+    Returns:
+        (dict) Rows found and the results of each statistics calculation.
+    """
+    report = {'rows': len(df.index)}
+    if report['rows'] == 0:    # Statistics need at least one row.
+        return report
+
+    report['time'] = time_stats_data(df, month, day)
+    report['station'] = station_stats_data(df)
+    report['trip_duration'] = trip_duration_stats_data(df)
+    report['user'] = user_stats_data(df)
+    return report
+
+
+def query_report(df, month, day):
+    """Filter unfiltered city data and collect its statistics report.
+
+    Used by the server so that both steps run in a worker thread.
+    Args:
+        (DataFrame) df - Pandas DataFrame of city data from load_data.
+        (str) month - Name of the month to filter by, or "All".
+        (str) day - Name of the day of week to filter by, or "All".
+    Returns:
+        (dict) Report from statistics_report.
+    """
+    return statistics_report(filter_data(df, month, day), month, day)
+
+
+async def handle_request(city_data, cache, reader, writer):
+    """Answer one HTTP request for statistics as JSON.
+
+    Supported requests (names may be shortened as in the console, e.g.
+    "c" for Chicago; month and day default to "All"):
+        GET /cities - List the cities held in memory.
+        GET /stats?city=Chicago&month=March&day=Monday - Statistics.
+    Reports are computed in a worker thread so other requests are not
+    blocked, and kept in the cache. Identical queries arriving while a
+    report is computed wait for that same computation. A client must
+    send its request within REQUEST_TIMEOUT seconds, with no more than
+    MAX_HEADER_LINES header lines.
+    Args:
+        (dict) city_data - Unfiltered DataFrame of each city name.
+        (OrderedDict) cache - Report futures keyed by (city, month, day).
+        (StreamReader) reader - asyncio stream of the request.
+        (StreamWriter) writer - asyncio stream of the response.
+    Returns:
+        None.
+    """
+    async def read_request_line():
+        """Return the request line split in parts, and an error status."""
+        try:
+            request_line = (await reader.readline()).decode('latin-1').split()
+            # Skip the headers, up to the blank line ending them.
+            for _ in range(MAX_HEADER_LINES + 1):
+                if not (await reader.readline()).strip():
+                    return request_line, None
+        except ValueError:    # A line is longer than the stream limit.
+            return None, http.HTTPStatus.BAD_REQUEST
+        return None, http.HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE
+
+    status = http.HTTPStatus.OK
+    try:
+        request_line, error_status = await asyncio.wait_for(
+                read_request_line(), REQUEST_TIMEOUT)
+
+        if error_status is not None:
+            status = error_status
+            body = {'error': 'Request line or headers too large.'}
+        elif len(request_line) != 3:
+            status = http.HTTPStatus.BAD_REQUEST
+            body = {'error': 'Malformed request line.'}
+        elif request_line[0] != 'GET':
+            status = http.HTTPStatus.METHOD_NOT_ALLOWED
+            body = {'error': 'Only GET requests are supported.'}
+        else:
+            url = urllib.parse.urlsplit(request_line[1])
+            query = dict(urllib.parse.parse_qsl(url.query))
+            if url.path == '/cities':
+                body = {'cities': list(city_data.keys())}
+            elif url.path == '/stats':
+                # Each filter must uniquely match one of its options.
+                selection = []
+                for name, options, default in (
+                        ('city', list(city_data.keys()), None),
+                        ('month', list(MONTHS[1:13]) + ['All'], 'All'),
+                        ('day', list(WEEKDAYS) + ['All'], 'All')):
+                    value = query.get(name, default)
+                    matched = ([] if value is None
+                            else match_start_string(options, value))
+                    if len(matched) != 1:
+                        break
+                    selection.append(matched[0])
+
+                if len(selection) != 3:
+                    status = http.HTTPStatus.BAD_REQUEST
+                    body = {'error': 'No unique {} matches "{}".'
+                            .format(name, value), 'options': options}
+                else:
+                    key = tuple(selection)
+                    if key in cache:
+                        cache.move_to_end(key)
+                    else:
+                        city, month, day = key
+                        cache[key] = asyncio.get_running_loop(
+                                ).run_in_executor(None, query_report,
+                                city_data[city], month, day)
+                        if len(cache) > QUERY_CACHE_SIZE:
+                            cache.popitem(last=False)
+                    report = cache[key]
+                    body = dict(zip(('city', 'month', 'day'), key))
+                    try:
+                        body.update(await asyncio.shield(report))
+                    except Exception as Error:
+                        # Don't keep a failed report for later queries.
+                        if cache.get(key) is report:
+                            del cache[key]
+                        status = http.HTTPStatus.INTERNAL_SERVER_ERROR
+                        body = {'error': str(Error)}
+            else:
+                status = http.HTTPStatus.NOT_FOUND
+                body = {'error': 'Use /cities or /stats.'}
+    except asyncio.TimeoutError:
+        status = http.HTTPStatus.REQUEST_TIMEOUT
+        body = {'error': 'No request received in time.'}
+    except Exception as Error:
+        status = http.HTTPStatus.INTERNAL_SERVER_ERROR
+        body = {'error': str(Error)}
+
+    content = json.dumps(body, indent=2).encode('utf-8')
+    writer.write('HTTP/1.1 {} {}\r\nContent-Type: application/json\r\n'
+            'Content-Length: {}\r\nConnection: close\r\n\r\n'
+            .format(status.value, status.phrase, len(content))
+            .encode('latin-1') + content)
+    try:
+        await writer.drain()
+    finally:
+        writer.close()
+
+
+async def serve(args):
+    """Load all available cities once and answer HTTP queries about them.
+
+    The server only listens on the loopback address and runs until
+    interrupted (e.g. Ctrl-C).
+    Args:
+        (Args) args - parser.parse_args() object from argparse.
+        For details of the arguments passed in, see main() function.
+    Returns:
+        None.
+    """
+    cities = available_cities()
+    if len(cities) == 0:     # No data files found.
+        print('No data files were found in the working directory.'
+        ' Please check!' )
+        return
+
+    # Load every city unfiltered, so queries only need to filter.
+    city_data = {city: load_data(city, 'All', 'All') for city in cities}
+    cache = OrderedDict()
+
+    server = await asyncio.start_server(
+            functools.partial(handle_request, city_data, cache),
+            SERVER_HOST, args.port)
+    print('\nServing bikeshare statistics on http://{}:{}/'
+            ' (Ctrl-C to quit).'.format(SERVER_HOST, args.port))
+    print('\tFor example: /stats?city=chicago&month=march&day=all')
+    async with server:
+        await server.serve_forever()
+
+
 def main():
     """Parse optional command line switches and handle exceptions.
 
@@ -661,6 +1121,8 @@ def main():
         -d, --debug - Switch off Exception handling to allow tracing.
         -p, --pagesize - specify the number of rows of raw data to show
         at a time. Default is 10 rows.
+        -s, --serve - Run as a local HTTP server instead of the console.
+        --port - Port of the HTTP server. Default is 8000.
     Returns:
         None.
     """
@@ -676,16 +1138,25 @@ def main():
             help='allows any and all exceptions to be fully displayed')
     parser.add_argument('-p', '--pagesize', default = 10, type=int,
             help='raw file page size, default is 10 data rows')
+    parser.add_argument('-s', '--serve', action='store_true',
+            help='answer statistics queries as a local HTTP server')
+    parser.add_argument('--port', default = 8000, type=int,
+            help='HTTP server port, default is 8000')
     args = parser.parse_args()
 
     # Handle exceptions elegantly, but allow for debugging if needed.
     # When in debug mode, main loop is run without exception handling.
     # Exception handling is not silent but highly simplified.
+    if args.serve:
+        run = functools.partial(asyncio.run, serve(args))
+    else:
+        run = functools.partial(main_loop, args)
+
     if args.debug:
-        main_loop(args)
+        run()
     else:
         try:
-            main_loop(args)
+            run()
         except KeyboardInterrupt:      # Usually means a desire to quit.
             print(QUIT_RECOGNIZED+SIGNOFF)
         except Exception as Error:
@@ -0,0 +1,209 @@
+"""Test bikeshare partitioned data and server mode.
+File: test_bikeshare.py
+
+Splits testdata.csv into partition files in a temporary directory to
+check how they are found, pruned and read. Serves testdata.csv on a
+free port of the loopback address with handle_request, and checks the
+answers of the supported requests with a loopback-only client.
+
+Run with 'python -m unittest' from the directory of this file.
+"""
+import asyncio
+import functools
+import json
+import os
+import tempfile
+import unittest
+from collections import OrderedDict
+from unittest import mock
+
+import bikeshare
+
+TEST_DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+        'testdata.csv')
+
+
+# Partition files and the lines (after the header) of testdata.csv in
+# them. Lines are in order: June, January, January, April, May, May.
+PARTITIONS = {'name_2017-01.csv': (1, 2),
+        'name_2017-05.csv': (4, 5),
+        'name_2017-06-23.csv': (0,),
+        'name_extra.csv': (3,),
+        }
+
+
+class PartitionTest(unittest.TestCase):
+    """City data split into monthly, daily and undated partitions."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+        with open(TEST_DATA) as test_file:
+            header, *lines = test_file.readlines()
+        for filename, line_numbers in PARTITIONS.items():
+            with open(os.path.join(self.directory, filename), 'w') as part:
+                part.writelines([header] + [lines[i] for i in line_numbers])
+
+        city_data = mock.patch.dict(bikeshare.CITY_DATA, {
+                'Directory': self.directory,
+                'Glob': os.path.join(self.directory, 'name_2017-*.csv'),
+                'Missing': os.path.join(self.directory, 'other_*.csv'),
+                }, clear=True)
+        city_data.start()
+        self.addCleanup(city_data.stop)
+
+    def load_data(self, city, month, day):
+        """Return load_data result and the basenames of files read."""
+        with mock.patch.object(bikeshare.pd, 'read_csv',
+                wraps=bikeshare.pd.read_csv) as read_csv:
+            df = bikeshare.load_data(city, month, day)
+        return df, sorted(os.path.basename(call.args[0])
+                for call in read_csv.call_args_list)
+
+    def test_available_cities(self):
+        self.assertEqual(bikeshare.available_cities(), ['Directory', 'Glob'])
+
+    def test_city_partitions(self):
+        self.assertEqual([os.path.basename(filename) for filename
+                in bikeshare.city_partitions(self.directory)],
+                sorted(PARTITIONS))
+
+    def test_load_all(self):
+        df, files_read = self.load_data('Directory', 'All', 'All')
+        self.assertEqual(files_read, sorted(PARTITIONS))
+        self.assertEqual(len(df.index), 6)
+
+    def test_load_month_pruned(self):
+        df, files_read = self.load_data('Directory', 'January', 'All')
+        self.assertEqual(files_read, ['name_2017-01.csv', 'name_extra.csv'])
+        self.assertEqual(len(df.index), 2)
+        self.assertEqual(set(df['Month']), {'January'})
+
+    def test_load_month_daily_partition(self):
+        df, files_read = self.load_data('Glob', 'June', 'All')
+        self.assertEqual(files_read, ['name_2017-06-23.csv'])
+        self.assertEqual(len(df.index), 1)
+
+    def test_load_month_no_partition(self):
+        df, files_read = self.load_data('Glob', 'March', 'All')
+        self.assertEqual(files_read, [])
+        self.assertTrue(df.empty)
+
+    def test_partition_month(self):
+        self.assertEqual(bikeshare.partition_month('x/name_2017-03.csv'), 3)
+        self.assertEqual(bikeshare.partition_month('name_2017-12-31.csv'), 12)
+        self.assertIsNone(bikeshare.partition_month('x_2017-13.csv'))
+        self.assertIsNone(bikeshare.partition_month('x_2017-00.csv'))
+        self.assertIsNone(bikeshare.partition_month('name_extra.csv'))
+
+
+class ServerTest(unittest.IsolatedAsyncioTestCase):
+    """Requests to a server holding the test data in memory."""
+
+    @classmethod
+    def setUpClass(cls):
+        with mock.patch.dict(bikeshare.CITY_DATA, {'Test Data': TEST_DATA}):
+            cls.city_data = {'Test Data': bikeshare.load_data('Test Data',
+                    'All', 'All')}
+
+    async def asyncSetUp(self):
+        self.cache = OrderedDict()
+        self.server = await asyncio.start_server(
+                functools.partial(bikeshare.handle_request, self.city_data,
+                self.cache), bikeshare.SERVER_HOST, 0)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def asyncTearDown(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def request(self, request_line, headers=('Host: localhost',)):
+        """Send one request and return (status code, JSON body)."""
+        reader, writer = await asyncio.open_connection(
+                bikeshare.SERVER_HOST, self.port)
+        writer.write('\r\n'.join((request_line,) + tuple(headers) + ('', ''))
+                .encode('latin-1'))
+        await writer.drain()
+        response = await reader.read()
+        writer.close()
+        head, _, content = response.partition(b'\r\n\r\n')
+        return int(head.split()[1]), json.loads(content.decode('utf-8'))
+
+    async def test_cities(self):
+        status, body = await self.request('GET /cities HTTP/1.1')
+        self.assertEqual(status, 200)
+        self.assertEqual(body, {'cities': ['Test Data']})
+
+    async def test_stats(self):
+        status, body = await self.request(
+                'GET /stats?city=test&month=all&day=all HTTP/1.1')
+        self.assertEqual(status, 200)
+        self.assertEqual((body['city'], body['month'], body['day']),
+                ('Test Data', 'All', 'All'))
+        self.assertEqual(body['rows'], len(self.city_data['Test Data']))
+        self.assertEqual(body['time']['month'], ['January', 'May'])
+        self.assertEqual(body['time']['hour'], [8, 18])
+        self.assertEqual(body['station']['start_station'],
+                ['May St & Taylor St', 'Theater on the Lake'])
+        self.assertEqual(body['trip_duration']['total'], 5213.0)
+        self.assertEqual(body['trip_duration']['longest'], 1610.0)
+        self.assertEqual(body['user']['user_type']['counts'],
+                {'Subscriber': 5, 'Customer': 1})
+        self.assertEqual(body['user']['birth_year']['earliest'], 1777)
+
+    async def test_stats_no_gender(self):
+        # The only April trip has no gender or birth year.
+        status, body = await self.request(
+                'GET /stats?city=test&month=april HTTP/1.1')
+        self.assertEqual(status, 200)
+        self.assertEqual(body['rows'], 1)
+        self.assertNotIn('month', body['time'])
+        self.assertIsNone(body['user']['gender'])
+        self.assertIsNone(body['user']['birth_year'])
+
+    async def test_stats_bad_filter(self):
+        # "j" matches both January and June, "x" matches no city.
+        for query in ('city=test&month=j', 'city=x'):
+            status, body = await self.request(
+                    'GET /stats?{} HTTP/1.1'.format(query))
+            self.assertEqual(status, 400)
+            self.assertIn('options', body)
+
+    async def test_stats_cached(self):
+        request_line = 'GET /stats?city=test HTTP/1.1'
+        with mock.patch.object(bikeshare, 'query_report',
+                wraps=bikeshare.query_report) as query_report:
+            first = await self.request(request_line)
+            second = await self.request(request_line)
+        self.assertEqual(first, second)
+        self.assertEqual(query_report.call_count, 1)
+        self.assertEqual(list(self.cache), [('Test Data', 'All', 'All')])
+
+    async def test_not_found(self):
+        status, _ = await self.request('GET /unknown HTTP/1.1')
+        self.assertEqual(status, 404)
+
+    async def test_method_not_allowed(self):
+        status, _ = await self.request('POST /stats HTTP/1.1')
+        self.assertEqual(status, 405)
+
+    async def test_malformed_request(self):
+        status, _ = await self.request('GET')
+        self.assertEqual(status, 400)
+
+    async def test_request_line_too_long(self):
+        status, _ = await self.request(
+                'GET /{} HTTP/1.1'.format('x' * 70000))
+        self.assertEqual(status, 400)
+
+    async def test_too_many_headers(self):
+        status, _ = await self.request('GET /cities HTTP/1.1',
+                ['X-Header: {}'.format(i)
+                for i in range(bikeshare.MAX_HEADER_LINES + 1)])
+        self.assertEqual(status, 431)
+
+
+if __name__ == '__main__':
+    unittest.main()